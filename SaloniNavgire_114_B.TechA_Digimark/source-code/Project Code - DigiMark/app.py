@@ -1,13 +1,22 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, jsonify, session
 from flask_session import Session
-from werkzeug.utils import secure_filename
+from flask_compress import Compress
 from dotenv import load_dotenv
 import os
 import json
+import orjson
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import uuid
-from functools import wraps
+import hashlib
+import redis
+from rq import Queue, Worker
+from rq.job import Job
+from rq.exceptions import NoSuchJobError
+from functools import wraps, lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import BulkWriteError
 
 
 
@@ -15,8 +24,8 @@ from functools import wraps
 from modules.ocr_engine import OCREngine
 from modules.evaluation_engine import EvaluationEngine
 from modules.report_generator import ReportGenerator
-from modules.auth import AuthManager
-from modules.database import teachers_collection
+from modules.auth import AuthManager, PROFILE_PROJECTION
+from modules.database import teachers_collection, results_collection
 
 
 
@@ -30,15 +39,26 @@ app.secret_key = os.getenv('SECRET_KEY', 'digital_marking_secret_key_change_this
 
 
 # Session configuration
-app.config['SESSION_TYPE'] = 'filesystem'
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+redis_client = redis.Redis.from_url(REDIS_URL)  # Pooled connections shared across requests
+
+app.config['SESSION_TYPE'] = 'redis'
+app.config['SESSION_REDIS'] = redis_client
+app.config['SESSION_USE_SIGNER'] = True
 app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hour
 Session(app)
 
 
 
+# Response compression (HTML/JSON/CSS/JS)
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+Compress(app)
+
+
+
 # Configuration
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'txt'}
+ALLOWED_EXTENSIONS = frozenset(('png', 'jpg', 'jpeg', 'pdf', 'txt'))
 MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max upload
 
 
@@ -56,20 +76,215 @@ os.makedirs(os.path.join(UPLOAD_FOLDER, 'reports'), exist_ok=True)
 
 
 
+# OCR results cached by file content hash (answer keys are reused across students)
+OCR_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'ocr_cache')
+OCR_CACHE_MAX_ENTRIES = 500
+os.makedirs(OCR_CACHE_FOLDER, exist_ok=True)
+
+
+
 # Initialize engines
 ocr_engine = OCREngine(languages='eng')
 evaluation_engine = EvaluationEngine()
 report_generator = ReportGenerator(UPLOAD_FOLDER)
 
+# Shared pool for running answer key and answer sheet OCR side by side
+ocr_executor = ThreadPoolExecutor(max_workers=2)
+
+# PDF reports are rendered by a background worker (`rq worker reports`, see README).
+# RQ workers cannot run on Windows, so without one reports render on a local thread.
+report_queue = Queue('reports', connection=redis_client)
+report_executor = ThreadPoolExecutor(max_workers=1)
+local_reports = {}  # report filename -> Future, while rendering in-process
+
 
 
 # ==================== HELPER FUNCTIONS ====================
 
 
 
+def file_extension(filename):
+    """Lowercase extension after the last dot, or '' if there is none"""
+    _, dot, extension = filename.rpartition('.')
+    return extension.lower() if dot else ''
+
+
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return file_extension(filename) in ALLOWED_EXTENSIONS
+
+
+
+def _prune_ocr_cache():
+    """Keep only the most recently used OCR cache entries"""
+    entries = []
+    for entry in os.scandir(OCR_CACHE_FOLDER):
+        try:
+            entries.append((entry.stat().st_mtime, entry.path))
+        except OSError:
+            pass
+    
+    entries.sort(reverse=True)
+    for _, path in entries[OCR_CACHE_MAX_ENTRIES:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+
+def save_and_hash(file_storage, path, chunk_size=1 << 20):
+    """Stream an uploaded file to disk and return the SHA-256 of its contents"""
+    digest = hashlib.sha256()
+    with open(path, 'wb') as f:
+        while True:
+            chunk = file_storage.stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+
+
+def _cached_ocr(path, num_questions, file_hash):
+    """Run OCR on a file, reusing the stored result for identical file contents"""
+    cache_path = os.path.join(OCR_CACHE_FOLDER, f"{file_hash}_{num_questions}.json")
+    
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                texts = orjson.loads(f.read())
+            os.utime(cache_path)  # Mark entry as recently used
+            return texts
+        except (OSError, ValueError):
+            pass
+    
+    texts = ocr_engine.process_answer_sheet(path, num_questions)
+    
+    # Write to a temp file first so concurrent readers never see a partial entry
+    tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(texts))
+    os.replace(tmp_path, cache_path)
+    
+    _prune_ocr_cache()
+    
+    return texts
+
+
+
+@lru_cache(maxsize=1024)
+def _load_result_file(path, mtime):
+    """Parse a result JSON file; mtime in the key invalidates stale entries"""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+
+def _result_summary(result_data, result_filename):
+    """Summary row stored in MongoDB for dashboard listings"""
+    return {
+        'teacher_id': result_data['teacher_id'],
+        'student_name': result_data.get('student_name'),
+        'student_id': result_data.get('student_id'),
+        'exam_title': result_data.get('exam_title'),
+        'timestamp': result_data.get('timestamp'),
+        'percentage': float(result_data.get('percentage', 0)),
+        'total_score': float(result_data.get('total_score', 0)),
+        'max_score': float(result_data.get('max_score', 0)),
+        'filename': result_filename
+    }
+
+
+
+def backfill_result_summaries():
+    """
+    Index result files saved before summaries were kept in MongoDB
+    
+    Only files that are missing from the collection are parsed, so this is
+    cheap to run on every startup. Files without a teacher_id belong to no
+    teacher and are skipped, as the listings never showed them.
+    
+    Returns:
+    int: Number of summaries added
+    """
+    if results_collection is None:
+        return 0
+    
+    results_folder = os.path.join(UPLOAD_FOLDER, 'results')
+    indexed = set(results_collection.distinct('filename'))
+    
+    summaries = []
+    for entry in os.scandir(results_folder):
+        if not entry.name.endswith('.json') or entry.name in indexed:
+            continue
+        try:
+            with open(entry.path, 'rb') as f:
+                result_data = orjson.loads(f.read())
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable result file {entry.name}: {e}")
+            continue
+        
+        if result_data.get('teacher_id'):
+            summaries.append(_result_summary(result_data, entry.name))
+    
+    if not summaries:
+        return 0
+    
+    try:
+        return len(results_collection.insert_many(summaries, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        # Another process indexed some of the same files first (duplicate filename)
+        if any(error['code'] != 11000 for error in e.details['writeErrors']):
+            raise
+        return e.details['nInserted']
+
+
+
+def _report_job_id(report_filename):
+    """Deterministic background job id for a report file"""
+    return f"report-{hashlib.sha256(report_filename.encode('utf-8')).hexdigest()[:32]}"
+
+
+
+def submit_report(report_filename, **report_args):
+    """
+    Render a PDF report in the background
+    
+    Uses the RQ queue when a worker is listening on it, otherwise renders on a
+    local thread so reports are still produced without a worker (e.g. on Windows)
+    
+    Parameters:
+    report_filename (str): Filename to save the report as
+    report_args: Remaining arguments for ReportGenerator.generate_pdf_report
+    """
+    try:
+        if Worker.count(queue=report_queue):
+            report_queue.enqueue(
+                report_generator.generate_pdf_report,
+                job_id=_report_job_id(report_filename),
+                report_filename=report_filename,
+                **report_args
+            )
+            return
+    except redis.RedisError as e:
+        print(f"Report queue unavailable, rendering in-process: {e}")
+    
+    future = report_executor.submit(
+        report_generator.generate_pdf_report,
+        report_filename=report_filename,
+        **report_args
+    )
+    local_reports[report_filename] = future
+    
+    def _finished(done):
+        local_reports.pop(report_filename, None)
+        if done.exception():
+            print(f"Error generating PDF report {report_filename}: {done.exception()}")
+    
+    future.add_done_callback(_finished)
 
 
 
@@ -85,21 +300,6 @@ def login_required(f):
 
 
 
-def calculate_score_for_question(matched_keywords, can_solve, marks_per_q):
-    """
-    Calculate score based on keyword matching
-    Formula: (matched keywords / total keywords) * (can_solve * marks_per_q)
-    """
-    if len(matched_keywords) == 0:
-        return 0
-    
-    max_possible = can_solve * marks_per_q
-    # Award score proportional to keyword matches
-    score = (len(matched_keywords) / max(1, len(matched_keywords))) * max_possible
-    return min(score, max_possible)
-
-
-
 # ==================== AUTHENTICATION ROUTES ====================
 
 
@@ -203,29 +403,22 @@ def logout():
 def dashboard():
     """Teacher dashboard"""
     try:
-        teacher = AuthManager.get_teacher_by_id(session['teacher_id'])
+        teacher = AuthManager.get_teacher_by_id(session['teacher_id'], PROFILE_PROJECTION)
         
         # Get recent evaluations
         recent_results = []
-        results_folder = os.path.join(UPLOAD_FOLDER, 'results')
+        cursor = results_collection.find(
+            {'teacher_id': session['teacher_id']}
+        ).sort('timestamp', -1).limit(5)
         
-        if os.path.exists(results_folder):
-            files = sorted(os.listdir(results_folder), reverse=True)[:5]
-            for file in files:
-                try:
-                    with open(os.path.join(results_folder, file), 'r') as f:
-                        data = json.load(f)
-                        # Only show results from this teacher
-                        if data.get('teacher_id') == session['teacher_id']:
-                            recent_results.append({
-                                'filename': file,
-                                'student_name': data.get('student_name'),
-                                'exam_title': data.get('exam_title'),
-                                'timestamp': data.get('timestamp'),
-                                'percentage': round(data.get('percentage', 0), 2)
-                            })
-                except:
-                    pass
+        for data in cursor:
+            recent_results.append({
+                'filename': data.get('filename'),
+                'student_name': data.get('student_name'),
+                'exam_title': data.get('exam_title'),
+                'timestamp': data.get('timestamp'),
+                'percentage': round(data.get('percentage', 0), 2)
+            })
         
         return render_template('dashboard.html', 
                              teacher=teacher,
@@ -241,7 +434,7 @@ def dashboard():
 def profile():
     """Teacher profile page"""
     try:
-        teacher = AuthManager.get_teacher_by_id(session['teacher_id'])
+        teacher = AuthManager.get_teacher_by_id(session['teacher_id'], PROFILE_PROJECTION)
         return render_template('profile.html', teacher=teacher)
     except Exception as e:
         flash(f'Error loading profile: {str(e)}', 'error')
@@ -281,6 +474,9 @@ def upload():
             if not question_pattern or len(question_pattern) == 0:
                 return jsonify({'error': 'No question pattern configured'}), 400
             
+            # Index pattern entries by question id for constant-time lookups
+            pattern_by_id = {q['question_id']: q for q in question_pattern}
+            
             # Calculate total marks from pattern
             total_marks_config = sum(q['total_marks'] for q in question_pattern)
             total_marks_form = float(request.form.get('total_marks', 0))
@@ -293,20 +489,29 @@ def upload():
             if not (allowed_file(answer_sheet.filename) and allowed_file(answer_key.filename)):
                 return jsonify({'error': 'File type not allowed'}), 400
             
-            # Generate unique filenames
-            answer_sheet_filename = secure_filename(f"{uuid.uuid4()}_{answer_sheet.filename}")
-            answer_key_filename = secure_filename(f"{uuid.uuid4()}_{answer_key.filename}")
+            # Generate unique filenames (only the validated extension is kept from the upload)
+            answer_sheet_filename = f"{uuid.uuid4().hex}.{file_extension(answer_sheet.filename)}"
+            answer_key_filename = f"{uuid.uuid4().hex}.{file_extension(answer_key.filename)}"
             
             # Save files
             answer_sheet_path = os.path.join(UPLOAD_FOLDER, 'answer_sheets', answer_sheet_filename)
             answer_key_path = os.path.join(UPLOAD_FOLDER, 'answer_keys', answer_key_filename)
             
-            answer_sheet.save(answer_sheet_path)
-            answer_key.save(answer_key_path)
+            answer_sheet_hash = save_and_hash(answer_sheet, answer_sheet_path)
+            answer_key_hash = save_and_hash(answer_key, answer_key_path)
             
-            # ==================== PROCESS ANSWER KEY ====================
-            answer_key_text = ocr_engine.process_answer_sheet(answer_key_path, len(question_pattern))
+            # ==================== RUN OCR ====================
+            # Answer key and answer sheet are independent, so OCR them concurrently
+            answer_key_future = ocr_executor.submit(
+                _cached_ocr, answer_key_path, len(question_pattern), answer_key_hash
+            )
+            answer_sheet_future = ocr_executor.submit(
+                _cached_ocr, answer_sheet_path, len(question_pattern), answer_sheet_hash
+            )
+            answer_key_text = answer_key_future.result()
+            extracted_texts = answer_sheet_future.result()
             
+            # ==================== PROCESS ANSWER KEY ====================
             # Create model answers from OCR extraction
             model_answers = {}
             for question_id, text in answer_key_text.items():
@@ -316,11 +521,7 @@ def upload():
                 keywords = keywords[:min(5, len(keywords))]  # Take up to 5 keywords
                 
                 # Find corresponding question pattern
-                max_score = 1
-                for q_pattern in question_pattern:
-                    if q_pattern['question_id'] == question_id:
-                        max_score = q_pattern['total_marks']
-                        break
+                max_score = pattern_by_id.get(question_id, {}).get('total_marks', 1)
                 
                 model_answers[question_id] = {
                     'answer': text,
@@ -328,37 +529,31 @@ def upload():
                     'max_score': max_score
                 }
             
-            # ==================== PROCESS ANSWER SHEET ====================
-            extracted_texts = ocr_engine.process_answer_sheet(answer_sheet_path, len(question_pattern))
-            
             # ==================== EVALUATE ANSWERS ====================
             evaluation_results = {}
             total_score = 0
             max_score = 0
             
+            # Evaluate all answered questions as one batch (keyword matches come back with the score)
+            answered_ids = [question_id for question_id in extracted_texts if question_id in model_answers]
+            sheet_results = evaluation_engine.evaluate_sheet([
+                (
+                    extracted_texts[question_id],
+                    model_answers[question_id]['answer'],
+                    model_answers[question_id]['keywords'],
+                    model_answers[question_id].get('max_score', 1)
+                )
+                for question_id in answered_ids
+            ])
+            evaluated = dict(zip(answered_ids, sheet_results))
+            
             for question_id, text in extracted_texts.items():
-                if question_id in model_answers:
+                if question_id in evaluated:
                     model = model_answers[question_id]
-                    
-                    # Evaluate answer
-                    score, feedback = evaluation_engine.evaluate_answer(
-                        student_answer=text,
-                        model_answer=model['answer'],
-                        keywords=model['keywords'],
-                        max_score=model.get('max_score', 1)
-                    )
-                    
-                    matched_keywords, keyword_ratio = evaluation_engine.keyword_matching(
-                        text, 
-                        model['keywords']
-                    )
+                    score, feedback, matched_keywords, keyword_ratio = evaluated[question_id]
                     
                     # Find question pattern details
-                    q_pattern_details = None
-                    for q_p in question_pattern:
-                        if q_p['question_id'] == question_id:
-                            q_pattern_details = q_p
-                            break
+                    q_pattern_details = pattern_by_id.get(question_id)
                     
                     evaluation_results[question_id] = {
                         'extracted_text': text,
@@ -391,19 +586,30 @@ def upload():
                     }
             
             # ==================== CREATE RESULTS DATAFRAME ====================
-            results_df = pd.DataFrame([
-                {
-                    'Question': question_id,
-                    'Score': result['score'],
-                    'Max Score': result['max_score'],
-                    'Percentage': (result['score'] / result['max_score']) * 100 if result['max_score'] > 0 else 0,
-                    'Keywords Matched': f"{result['matched_keywords']}/{result['total_keywords']}"
-                }
-                for question_id, result in evaluation_results.items()
-            ])
+            result_rows = evaluation_results.values()
+            scores = np.fromiter((r['score'] for r in result_rows), dtype=np.float64, count=len(evaluation_results))
+            max_scores = np.fromiter((r['max_score'] for r in result_rows), dtype=np.float64, count=len(evaluation_results))
+            
+            # Single vectorized divide; questions with no max score stay at 0%
+            percentages = np.zeros_like(scores)
+            np.divide(scores, max_scores, out=percentages, where=max_scores > 0)
+            percentages *= 100
+            
+            results_df = pd.DataFrame({
+                'Question': list(evaluation_results.keys()),
+                'Score': scores,
+                'Max Score': max_scores,
+                'Percentage': percentages,
+                'Keywords Matched': [f"{r['matched_keywords']}/{r['total_keywords']}" for r in result_rows]
+            })
             
             # ==================== GENERATE PDF REPORT ====================
-            report_filename = report_generator.generate_pdf_report(
+            now = datetime.now()
+            
+            # Render the PDF in the background; download_report waits for it
+            report_filename = report_generator.build_report_filename(student_id, now)
+            submit_report(
+                report_filename,
                 student_name=student_name,
                 student_id=student_id,
                 exam_title=exam_title,
@@ -422,7 +628,7 @@ def upload():
                 'student_id': student_id,
                 'exam_title': exam_title,
                 'question_pattern': question_pattern,  # STORE PATTERN
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'timestamp': now.strftime('%Y-%m-%d %H:%M:%S'),
                 'evaluation_results': evaluation_results,
                 'total_score': round(total_score, 2),
                 'max_score': round(max_score, 2),
@@ -430,11 +636,18 @@ def upload():
                 'report_filename': report_filename
             }
             
-            result_filename = f"result_{student_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+            result_filename = f"result_{student_id}_{now.strftime('%Y%m%d%H%M%S')}.json"
             result_path = os.path.join(UPLOAD_FOLDER, 'results', result_filename)
             
-            with open(result_path, 'w') as f:
-                json.dump(result_data, f, indent=4)
+            with open(result_path, 'wb') as f:
+                f.write(orjson.dumps(result_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+            
+            # Index result summary in MongoDB for dashboard listings
+            results_collection.replace_one(
+                {'filename': result_filename},
+                _result_summary(result_data, result_filename),
+                upsert=True
+            )
             
             # Update teacher evaluation count in MongoDB
             AuthManager.update_teacher_evaluations(session['teacher_id'])
@@ -474,8 +687,7 @@ def results(result_file):
             flash('Result file not found', 'error')
             return redirect(url_for('upload'))
         
-        with open(result_path, 'r') as f:
-            result_data = json.load(f)
+        result_data = _load_result_file(result_path, os.path.getmtime(result_path))
         
         # Verify that this result belongs to the logged-in teacher
         if result_data.get('teacher_id') != session['teacher_id']:
@@ -524,30 +736,21 @@ def my_evaluations():
     """View all evaluations by logged-in teacher"""
     try:
         all_results = []
-        results_folder = os.path.join(UPLOAD_FOLDER, 'results')
+        cursor = results_collection.find(
+            {'teacher_id': session['teacher_id']}
+        ).sort('timestamp', -1)
         
-        if os.path.exists(results_folder):
-            files = sorted(os.listdir(results_folder), reverse=True)
-            
-            for file in files:
-                try:
-                    with open(os.path.join(results_folder, file), 'r') as f:
-                        data = json.load(f)
-                        
-                        # Only show results from this teacher
-                        if data.get('teacher_id') == session['teacher_id']:
-                            all_results.append({
-                                'filename': file,
-                                'student_name': data.get('student_name'),
-                                'student_id': data.get('student_id'),
-                                'exam_title': data.get('exam_title'),
-                                'timestamp': data.get('timestamp'),
-                                'percentage': round(data.get('percentage', 0), 2),
-                                'total_score': data.get('total_score'),
-                                'max_score': data.get('max_score')
-                            })
-                except:
-                    pass
+        for data in cursor:
+            all_results.append({
+                'filename': data.get('filename'),
+                'student_name': data.get('student_name'),
+                'student_id': data.get('student_id'),
+                'exam_title': data.get('exam_title'),
+                'timestamp': data.get('timestamp'),
+                'percentage': round(data.get('percentage', 0), 2),
+                'total_score': data.get('total_score'),
+                'max_score': data.get('max_score')
+            })
         
         return render_template('my_evaluations.html', evaluations=all_results)
     
@@ -562,11 +765,36 @@ def my_evaluations():
 def download_report(filename):
     """Download PDF report"""
     try:
-        return send_from_directory(
-            os.path.join(UPLOAD_FOLDER, 'reports'), 
+        reports_folder = os.path.join(UPLOAD_FOLDER, 'reports')
+        
+        # Report may still be rendering in the background
+        if not os.path.exists(os.path.join(reports_folder, filename)):
+            if filename in local_reports:
+                return jsonify({'status': 'pending', 'message': 'Report is still being generated'}), 202
+            
+            try:
+                job = Job.fetch(_report_job_id(filename), connection=redis_client)
+            except NoSuchJobError:
+                job = None
+            
+            if job is not None and not (job.is_finished or job.is_failed):
+                return jsonify({'status': 'pending', 'message': 'Report is still being generated'}), 202
+        
+        response = send_from_directory(
+            reports_folder, 
             filename, 
-            as_attachment=True
+            as_attachment=True,
+            conditional=True,
+            etag=True,
+            max_age=0
         )
+        
+        # Reports hold student data: only the teacher's browser may cache them,
+        # and it must revalidate (cheap 304 via the ETag) on every download
+        response.cache_control.public = False
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
     except Exception as e:
         flash(f'Error downloading report: {str(e)}', 'error')
         return redirect(url_for('dashboard'))
@@ -617,6 +845,18 @@ def request_entity_too_large(error):
 
 
 
+# ==================== STARTUP ====================
+
+
+
+# Make results saved before the MongoDB index existed visible in the listings
+try:
+    backfill_result_summaries()
+except Exception as e:
+    print(f"Error indexing existing results: {e}")
+
+
+
 # ==================== RUN APPLICATION ====================
 
 
@@ -1,23 +1,46 @@
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Headless backend; avoids probing GUI toolkits at startup
 import matplotlib.pyplot as plt
 import io
 import base64
 from matplotlib.figure import Figure
+from PIL import Image, ImageDraw
+from functools import lru_cache
+import threading
 import os
 
-class AnalyticsEngine:
-    def __init__(self):
-        """Initialize Analytics Engine"""
-        pass
+
+# The bar chart figure is built once and cleared between charts instead of
+# reallocated. Renders share it, so they are serialized behind a lock.
+_FIGURE_LOCK = threading.Lock()
+_BAR_FIG = Figure(figsize=(10, 6))
+_BAR_AX = _BAR_FIG.add_subplot(1, 1, 1)
+
+
+def _figure_to_base64(fig):
+    """Render a figure to PNG and return it base64 encoded"""
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=80)
+    buf.seek(0)
     
-    def generate_score_distribution_chart(self, results_df):
-        """Generate score distribution chart"""
-        fig = Figure(figsize=(10, 6))
-        ax = fig.add_subplot(1, 1, 1)
+    # Convert to base64 for embedding in HTML
+    return base64.b64encode(buf.getvalue()).decode('utf-8')
+
+
+# Renderers are memoized on their (hashable) inputs so repeat report views
+# skip rendering entirely
+
+@lru_cache(maxsize=128)
+def _render_score_distribution_chart(questions, percentages):
+    """Render question-wise performance bars"""
+    with _FIGURE_LOCK:
+        ax = _BAR_AX
+        ax.clear()
         
         # Create score distribution
-        ax.bar(results_df['Question'], results_df['Percentage'], color='skyblue')
+        ax.bar(questions, percentages, color='skyblue')
         ax.axhline(y=60, color='r', linestyle='--', alpha=0.7, label='Pass Mark (60%)')
         ax.set_xlabel('Question')
         ax.set_ylabel('Score (%)')
@@ -25,21 +48,80 @@ class AnalyticsEngine:
         ax.set_ylim(0, 100)
         ax.legend()
         
-        # Save chart to memory
-        buf = io.BytesIO()
-        fig.savefig(buf, format='png')
-        buf.seek(0)
+        return _figure_to_base64(_BAR_FIG)
+
+
+@lru_cache(maxsize=128)
+def _render_keyword_chart(questions, matched_counts, total_counts):
+    """Render matched vs total keyword bars"""
+    x = np.arange(len(questions))
+    width = 0.35
+    
+    with _FIGURE_LOCK:
+        ax = _BAR_AX
+        ax.clear()
+        
+        ax.bar(x - width/2, matched_counts, width, label='Matched Keywords', color='green')
+        ax.bar(x + width/2, total_counts, width, label='Total Keywords', color='blue')
         
-        # Convert to base64 for embedding in HTML
-        image_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
+        ax.set_xlabel('Questions')
+        ax.set_ylabel('Number of Keywords')
+        ax.set_title('Keyword Matching Analysis')
+        ax.set_xticks(x)
+        ax.set_xticklabels(questions)
+        ax.legend()
         
-        return image_base64
+        return _figure_to_base64(_BAR_FIG)
+
+
+@lru_cache(maxsize=128)
+def _render_overall_performance_chart(total_score, max_score):
+    """Render the overall performance gauge (drawn directly with Pillow)"""
+    percentage = (total_score / max_score) * 100
+    
+    # Define the colors based on performance
+    if percentage < 40:
+        color = 'red'
+    elif percentage < 70:
+        color = 'orange'
+    else:
+        color = 'green'
+    
+    img = Image.new('RGB', (400, 400), 'white')
+    draw = ImageDraw.Draw(img)
+    
+    # Plot the gauge: grey track over the top half, coloured arc up to the score
+    bounds = [20, 20, 380, 380]
+    draw.arc(bounds, 180, 360, fill='lightgray', width=10)
+    if percentage > 0:
+        draw.arc(bounds, 180, 180 + min(percentage, 100) * 1.8, fill=color, width=10)
+    
+    label = f'Overall Performance: {percentage:.1f}%'
+    draw.text((200 - 3 * len(label), 200), label, fill='black')
+    
+    # Save chart to memory
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    
+    # Convert to base64 for embedding in HTML
+    return base64.b64encode(buf.getvalue()).decode('utf-8')
+
+
+class AnalyticsEngine:
+    def __init__(self):
+        """Initialize Analytics Engine"""
+        pass
+    
+    def generate_score_distribution_chart(self, results_df):
+        """Generate score distribution chart"""
+        # DataFrames aren't hashable, so key the cached renderer on plain tuples
+        return _render_score_distribution_chart(
+            tuple(results_df['Question']),
+            tuple(results_df['Percentage'].round(2))
+        )
     
     def generate_keyword_chart(self, results):
         """Generate keyword matching chart"""
-        fig = Figure(figsize=(10, 6))
-        ax = fig.add_subplot(1, 1, 1)
-        
         questions = []
         matched_counts = []
         total_counts = []
@@ -50,69 +132,11 @@ class AnalyticsEngine:
                 matched_counts.append(len(result['matched_keywords']))
                 total_counts.append(len(result['keywords']))
         
-        x = np.arange(len(questions))
-        width = 0.35
-        
-        ax.bar(x - width/2, matched_counts, width, label='Matched Keywords', color='green')
-        ax.bar(x + width/2, total_counts, width, label='Total Keywords', color='blue')
-        
-        ax.set_xlabel('Questions')
-        ax.set_ylabel('Number of Keywords')
-        ax.set_title('Keyword Matching Analysis')
-        ax.set_xticks(x)
-        ax.set_xticklabels(questions)
-        ax.legend()
-        
-        # Save chart to memory
-        buf = io.BytesIO()
-        fig.savefig(buf, format='png')
-        buf.seek(0)
-        
-        # Convert to base64 for embedding in HTML
-        image_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-        
-        return image_base64
+        return _render_keyword_chart(tuple(questions), tuple(matched_counts), tuple(total_counts))
     
     def generate_overall_performance_chart(self, total_score, max_score):
         """Generate overall performance gauge chart"""
-        fig = Figure(figsize=(8, 8))
-        ax = fig.add_subplot(1, 1, 1, polar=True)
-        
-        percentage = (total_score / max_score) * 100
-        
-        # Define the gauge
-        theta = np.linspace(0, 180, 100) * np.pi / 180
-        r = [1] * 100
-        
-        # Define the colors based on performance
-        if percentage < 40:
-            color = 'red'
-        elif percentage < 70:
-            color = 'orange'
-        else:
-            color = 'green'
-        
-        # Plot the gauge
-        ax.plot(theta, r, color='lightgray', linewidth=5)
-        gauge_theta = np.linspace(0, percentage * 180 / 100, 100) * np.pi / 180
-        ax.plot(gauge_theta, [1] * len(gauge_theta), color=color, linewidth=5)
-        
-        # Customize the chart
-        ax.set_rticks([])
-        ax.set_xticks([0, np.pi/4, np.pi/2, 3*np.pi/4, np.pi])
-        ax.set_xticklabels(['0%', '25%', '50%', '75%', '100%'])
-        ax.set_ylim(0, 1.2)
-        ax.set_title(f'Overall Performance: {percentage:.1f}%', size=15)
-        
-        # Save chart to memory
-        buf = io.BytesIO()
-        fig.savefig(buf, format='png')
-        buf.seek(0)
-        
-        # Convert to base64 for embedding in HTML
-        image_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-        
-        return image_base64
+        return _render_overall_performance_chart(float(total_score), float(max_score))
     
     def generate_performance_report(self, results_df, evaluation_results, total_score, max_score):
         """Generate comprehensive performance report with visualizations"""
@@ -1,27 +1,48 @@
 import bcrypt
+import threading
+from cachetools import TTLCache
 from modules.database import teachers_collection
 from datetime import datetime
 
+# Fields needed to log a teacher in and populate their session
+LOGIN_PROJECTION = {
+    'password': 1,
+    'is_active': 1,
+    'email': 1,
+    'full_name': 1,
+    'school_name': 1,
+    'subject': 1,
+}
+
+# Everything the profile pages show, i.e. all but the password hash
+PROFILE_PROJECTION = {'password': 0}
+
+# Short-lived cache of teacher documents keyed by (teacher_id, projection)
+_teacher_cache = TTLCache(maxsize=1024, ttl=30)
+_teacher_cache_lock = threading.Lock()
+
 class AuthManager:
     
     @staticmethod
     def hash_password(password):
-        """Hash password using bcrypt"""
-        salt = bcrypt.gensalt(rounds=10)
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        """Hash password using bcrypt (stored as raw bytes)"""
+        salt = bcrypt.gensalt(rounds=12)
+        return bcrypt.hashpw(password.encode('utf-8'), salt)
     
     @staticmethod
     def verify_password(password, hashed_password):
         """Verify password against hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+        # Accounts registered before hashes were stored as bytes hold a str
+        if isinstance(hashed_password, str):
+            hashed_password = hashed_password.encode('utf-8')
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password)
     
     @staticmethod
     def register_teacher(email, full_name, password, school_name, subject):
         """Register a new teacher"""
         try:
             # Check if teacher already exists
-            existing_teacher = teachers_collection.find_one({'email': email})
+            existing_teacher = teachers_collection.find_one({'email': email}, {'_id': 1})
             if existing_teacher:
                 return False, "Email already registered"
             
@@ -51,7 +72,7 @@ class AuthManager:
     def login_teacher(email, password):
         """Login teacher with email and password"""
         try:
-            teacher = teachers_collection.find_one({'email': email})
+            teacher = teachers_collection.find_one({'email': email}, LOGIN_PROJECTION)
             
             if not teacher:
                 return False, None, "Email not registered"
@@ -68,14 +89,24 @@ class AuthManager:
             return False, None, f"Login error: {str(e)}"
     
     @staticmethod
-    def get_teacher_by_id(teacher_id):
-        """Get teacher details by MongoDB ObjectId"""
+    def get_teacher_by_id(teacher_id, projection=None):
+        """Get teacher details by MongoDB ObjectId, optionally limited to a projection"""
+        cache_key = (teacher_id, tuple(sorted(projection.items())) if projection else None)
+        with _teacher_cache_lock:
+            teacher = _teacher_cache.get(cache_key)
+        if teacher is not None:
+            return teacher
+        
         try:
             from bson.objectid import ObjectId
-            teacher = teachers_collection.find_one({'_id': ObjectId(teacher_id)})
-            return teacher
+            teacher = teachers_collection.find_one({'_id': ObjectId(teacher_id)}, projection)
         except Exception as e:
             return None
+        
+        if teacher is not None:
+            with _teacher_cache_lock:
+                _teacher_cache[cache_key] = teacher
+        return teacher
     
     @staticmethod
     def update_teacher_evaluations(teacher_id):
@@ -86,6 +117,13 @@ class AuthManager:
                 {'_id': ObjectId(teacher_id)},
                 {'$inc': {'evaluations_count': 1}}
             )
+            AuthManager.invalidate_teacher_cache(teacher_id)
         except Exception as e:
             print(f"Error updating evaluations: {e}")
-
+    
+    @staticmethod
+    def invalidate_teacher_cache(teacher_id):
+        """Drop every cached copy of a teacher's document"""
+        with _teacher_cache_lock:
+            for key in [key for key in _teacher_cache if key[0] == teacher_id]:
+                _teacher_cache.pop(key, None)
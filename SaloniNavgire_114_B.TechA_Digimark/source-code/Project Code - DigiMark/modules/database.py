@@ -1,4 +1,5 @@
 from pymongo import MongoClient
+from pymongo.errors import OperationFailure
 from dotenv import load_dotenv
 import os
 
@@ -10,12 +11,31 @@ try:
     client = MongoClient(MONGO_URI)
     db = client['last']
     teachers_collection = db['teachers']
+    results_collection = db['results']
     
     # Create unique index on email
     teachers_collection.create_index('email', unique=True)
     
+    # Login looks teachers up by email and checks the active flag
+    teachers_collection.create_index([('email', 1), ('is_active', 1)])
+    
+    # Index for listing a teacher's most recent results
+    results_collection.create_index([('teacher_id', 1), ('timestamp', -1)])
+    # One summary per result file, so concurrent backfills can't duplicate rows
+    try:
+        results_collection.create_index('filename', unique=True)
+    except OperationFailure:
+        # Replace the earlier non-unique index on the same key
+        try:
+            results_collection.drop_index('filename_1')
+            results_collection.create_index('filename', unique=True)
+        except OperationFailure as e:
+            # e.g. duplicate summaries left by an earlier backfill race
+            print(f"⚠️ Could not create unique index on results.filename: {e}")
+    
     print("✅ MongoDB Connected Successfully")
 except Exception as e:
     print(f"❌ MongoDB Connection Error: {e}")
     db = None
     teachers_collection = None
+    results_collection = None
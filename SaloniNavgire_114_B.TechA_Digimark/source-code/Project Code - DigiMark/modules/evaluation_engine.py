@@ -3,26 +3,86 @@ from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 import re
 import string
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import math
 import numpy as np
+from collections import Counter
+from functools import lru_cache
+
+# Shared NLTK components, loaded once per process rather than per engine
+try:
+    _STOPWORDS = frozenset(stopwords.words('english'))
+except LookupError:
+    # Download required NLTK data if not present
+    nltk.download('stopwords')
+    nltk.download('wordnet')
+    nltk.download('omw-1.4')
+    _STOPWORDS = frozenset(stopwords.words('english'))
+
+# WordNet data is loaded lazily on first lemmatize call
+_LEMMATIZER = WordNetLemmatizer()
+
+
+@lru_cache(maxsize=100000)
+def _lemmatize(word):
+    """Lemmatize a single token (memoized; tokens repeat across answers)"""
+    return _LEMMATIZER.lemmatize(word)
+
+
+# Smoothed IDF of a term found in only one of two documents: ln((1 + 2) / (1 + 1)) + 1.
+# Terms found in both documents get an IDF of exactly 1.
+_IDF_ONE_DOC = math.log(3 / 2) + 1
+
+
+def _pair_tfidf_similarity(processed_a, processed_b):
+    """
+    Cosine similarity of two preprocessed texts under TF-IDF fitted on just
+    that pair (same weighting as sklearn's default TfidfVectorizer)
+    """
+    # Default vectorizer tokens: words of two or more characters
+    counts_a = Counter(word for word in processed_a.split() if len(word) > 1)
+    counts_b = Counter(word for word in processed_b.split() if len(word) > 1)
+    
+    if not counts_a or not counts_b:
+        return 0
+    
+    # Shared terms have IDF 1, so they contribute raw count products
+    dot = sum(count * counts_b[term] for term, count in counts_a.items() if term in counts_b)
+    if not dot:
+        return 0
+    
+    norm_a = sum((count if term in counts_b else count * _IDF_ONE_DOC) ** 2 for term, count in counts_a.items())
+    norm_b = sum((count if term in counts_a else count * _IDF_ONE_DOC) ** 2 for term, count in counts_b.items())
+    
+    return dot / math.sqrt(norm_a * norm_b)
+
 
 class EvaluationEngine:
+    # Anything that isn't a lowercase letter or whitespace
+    _CLEAN_RE = re.compile(r'[^a-z\s]')
+    
     def __init__(self):
         """Initialize Evaluation Engine"""
-        # Initialize NLTK components
-        try:
-            self.lemmatizer = WordNetLemmatizer()
-            self.stopwords_list = stopwords.words('english')
-        except LookupError:
-            # Download required NLTK data if not present
-            nltk.download('stopwords')
-            nltk.download('wordnet')
-            nltk.download('omw-1.4')
-            self.lemmatizer = WordNetLemmatizer()
-            self.stopwords_list = stopwords.words('english')
+        # NLTK components are shared module-level instances
+        self.lemmatizer = _LEMMATIZER
+        self.stopwords_set = _STOPWORDS
+        
+        # Model answers and keywords are preprocessed repeatedly while grading
+        self._preprocess_cached = lru_cache(maxsize=4096)(self._preprocess_uncached)
+        self._preprocess_keywords_cached = lru_cache(maxsize=1024)(self._preprocess_keywords_uncached)
     
     def preprocess_text(self, text):
+        """
+        Preprocess text for evaluation (memoized per input string)
+        
+        Parameters:
+        text (str): Input text
+        
+        Returns:
+        str: Preprocessed text
+        """
+        return self._preprocess_cached(text)
+    
+    def _preprocess_uncached(self, text):
         """
         Preprocess text for evaluation using regex approach
         
@@ -36,16 +96,32 @@ class EvaluationEngine:
         text = text.lower()
         
         # Remove special characters and numbers
-        text = re.sub(r'[^a-z\s]', ' ', text)
+        text = self._CLEAN_RE.sub(' ', text)
         
         # Remove stopwords
-        no_stop = [word for word in text.split() if word not in self.stopwords_list]
+        no_stop = [word for word in text.split() if word not in self.stopwords_set]
         
         # Lemmatize words
-        preprocessed = ' '.join([self.lemmatizer.lemmatize(word) for word in no_stop])
+        preprocessed = ' '.join([_lemmatize(word) for word in no_stop])
         
         return preprocessed
     
+    def preprocess_keywords(self, keywords):
+        """
+        Preprocess a keyword list once (memoized per keyword list)
+        
+        Parameters:
+        keywords (list): List of keywords
+        
+        Returns:
+        tuple: (original, processed) keyword pairs
+        """
+        return self._preprocess_keywords_cached(tuple(keywords))
+    
+    def _preprocess_keywords_uncached(self, keywords):
+        """Pair each keyword with its preprocessed form"""
+        return tuple((keyword, self.preprocess_text(keyword)) for keyword in keywords)
+    
     def keyword_matching(self, student_answer, keywords):
         """
         Check for presence of keywords in student answer
@@ -61,24 +137,40 @@ class EvaluationEngine:
         if not keywords:
             return [], 0
         
-        # Preprocess student answer
-        processed_answer = self.preprocess_text(student_answer)
+        return self._keyword_matching_processed(
+            self.preprocess_text(student_answer),
+            self.preprocess_keywords(keywords)
+        )
+    
+    def _keyword_matching_processed(self, processed_answer, processed_keywords):
+        """
+        Keyword matching on an already preprocessed answer
+        
+        Parameters:
+        processed_answer (str): Preprocessed student answer
+        processed_keywords (tuple): (original, processed) keyword pairs
+        
+        Returns:
+        tuple: (matched_keywords, match_ratio)
+        """
+        # Handle empty keywords
+        if not processed_keywords:
+            return [], 0
+        
+        answer_words = set(processed_answer.split())
         
         # Check for keyword matches
         matched_keywords = []
-        for keyword in keywords:
-            # Preprocess keyword
-            processed_keyword = self.preprocess_text(keyword)
-            
+        for keyword, processed_keyword in processed_keywords:
             # Check if keyword is in the answer (word-level matching)
-            if processed_keyword and processed_keyword in processed_answer.split():
+            if processed_keyword and processed_keyword in answer_words:
                 matched_keywords.append(keyword)
             # Also check if it's a substring (for multi-word keywords)
             elif processed_keyword and processed_keyword in processed_answer:
                 matched_keywords.append(keyword)
         
         # Calculate match ratio
-        match_ratio = len(matched_keywords) / len(keywords) if keywords else 0
+        match_ratio = len(matched_keywords) / len(processed_keywords)
         
         return matched_keywords, match_ratio
     
@@ -98,31 +190,26 @@ class EvaluationEngine:
         if not student_answer or not model_answer:
             return 0
         
-        # Preprocess texts
-        processed_student = self.preprocess_text(student_answer)
-        processed_model = self.preprocess_text(model_answer)
-        
-        # Handle empty preprocessed texts
-        if not processed_student or not processed_model:
-            return 0
+        return self._semantic_similarity_processed(
+            self.preprocess_text(student_answer),
+            self.preprocess_text(model_answer)
+        )
+    
+    def _semantic_similarity_processed(self, processed_student, processed_model):
+        """
+        Semantic similarity between already preprocessed answers
         
-        # Create TF-IDF vectors
-        try:
-            vectorizer = TfidfVectorizer()
-            tfidf_matrix = vectorizer.fit_transform([processed_model, processed_student])
-            
-            # Calculate cosine similarity
-            similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
-            
-            # Ensure similarity is in valid range [0, 1]
-            similarity = max(0, min(1, similarity))
+        Parameters:
+        processed_student (str): Preprocessed student answer
+        processed_model (str): Preprocessed model answer
         
-        except Exception as e:
-            # Handle case where vectorization fails
-            print(f"Error in semantic similarity calculation: {e}")
-            similarity = 0
+        Returns:
+        float: Similarity score between 0 and 1
+        """
+        similarity = _pair_tfidf_similarity(processed_model, processed_student)
         
-        return similarity
+        # Ensure similarity is in valid range [0, 1]
+        return max(0, min(1, similarity))
     
     def evaluate_answer(self, student_answer, model_answer, keywords, max_score):
         """
@@ -137,39 +224,83 @@ class EvaluationEngine:
         Returns:
         tuple: (score, feedback) - Score is float, feedback is string
         """
-        # Handle empty/invalid inputs
-        if not student_answer or student_answer.isspace():
-            return 0, "No answer provided."
-        
-        if not model_answer or model_answer.isspace():
-            return 0, "No model answer configured."
-        
-        if max_score <= 0:
-            max_score = 10
+        score, feedback, _, _ = self.evaluate_answer_detailed(
+            student_answer, model_answer, keywords, max_score
+        )
+        return score, feedback
+    
+    def evaluate_answer_detailed(self, student_answer, model_answer, keywords, max_score):
+        """
+        Evaluate a student answer and also return the keyword match details
+        computed along the way, so callers don't need to re-run keyword_matching
         
-        # Keyword matching
-        matched_keywords, keyword_ratio = self.keyword_matching(student_answer, keywords)
+        Parameters:
+        student_answer (str): Student's answer text
+        model_answer (str): Expected/model answer
+        keywords (list): List of important keywords for the answer
+        max_score (float): Maximum possible score for this question
         
-        # Semantic similarity
-        similarity = self.semantic_similarity(student_answer, model_answer)
+        Returns:
+        tuple: (score, feedback, matched_keywords, keyword_ratio)
+        """
+        return self.evaluate_sheet([(student_answer, model_answer, keywords, max_score)])[0]
+    
+    def evaluate_sheet(self, answers):
+        """
+        Evaluate all answers of a sheet in one pass
         
-        # Calculate score
-        # Weight: 60% keyword matching, 40% semantic similarity
-        weighted_score = (0.6 * keyword_ratio + 0.4 * similarity) * max_score
-        score = min(round(weighted_score, 2), max_score)  # Ensure score doesn't exceed max_score
+        Parameters:
+        answers (list): List of (student_answer, model_answer, keywords, max_score) tuples
         
-        # Generate feedback
-        feedback = self._generate_feedback(
-            student_answer, 
-            model_answer, 
-            matched_keywords, 
-            keywords, 
-            similarity,
-            score,
-            max_score
-        )
+        Returns:
+        list: (score, feedback, matched_keywords, keyword_ratio) for each answer
+        """
+        results = []
+        for student_answer, model_answer, keywords, max_score in answers:
+            # Handle empty/invalid inputs
+            if not student_answer or student_answer.isspace():
+                results.append((0, "No answer provided.", [], 0))
+                continue
+            
+            if not model_answer or model_answer.isspace():
+                results.append((0, "No model answer configured.", [], 0))
+                continue
+            
+            if max_score <= 0:
+                max_score = 10
+            
+            # Preprocess each text once and share it between both metrics
+            processed_student = self.preprocess_text(student_answer)
+            processed_model = self.preprocess_text(model_answer)
+            
+            # Keyword matching
+            matched_keywords, keyword_ratio = self._keyword_matching_processed(
+                processed_student,
+                self.preprocess_keywords(keywords or ())
+            )
+            
+            # Semantic similarity
+            similarity = self._semantic_similarity_processed(processed_student, processed_model)
+            
+            # Calculate score
+            # Weight: 60% keyword matching, 40% semantic similarity
+            weighted_score = (0.6 * keyword_ratio + 0.4 * similarity) * max_score
+            score = min(round(weighted_score, 2), max_score)  # Ensure score doesn't exceed max_score
+            
+            # Generate feedback
+            feedback = self._generate_feedback(
+                student_answer, 
+                model_answer, 
+                matched_keywords, 
+                keywords, 
+                similarity,
+                score,
+                max_score
+            )
+            
+            results.append((score, feedback, matched_keywords, keyword_ratio))
         
-        return score, feedback
+        return results
     
     def _generate_feedback(self, student_answer, model_answer, matched_keywords, all_keywords, similarity, score, max_score):
         """
@@ -202,7 +333,8 @@ class EvaluationEngine:
             feedback.append("✗ Your answer needs significant improvement.")
         
         # Missing keywords feedback
-        missing_keywords = [k for k in all_keywords if k not in matched_keywords]
+        matched_set = set(matched_keywords)
+        missing_keywords = [k for k in all_keywords if k not in matched_set]
         if missing_keywords:
             if len(missing_keywords) <= 2:
                 feedback.append(f"Missing key concepts: {', '.join(missing_keywords)}.")
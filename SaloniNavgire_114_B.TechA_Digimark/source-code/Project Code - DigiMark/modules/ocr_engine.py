@@ -1,15 +1,31 @@
 import cv2
 import numpy as np
 import pytesseract
+from pytesseract import Output
 from PIL import Image
 import os
 import re
 from pdf2image import convert_from_path
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # tesserocr keeps the engine and language data loaded between calls
+    from tesserocr import PyTessBaseAPI, PSM, OEM, RIL, iterate_level
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
 
 # Poppler bin path on your machine
 POPPLER_PATH = r"D:\last\poppler\poppler-25.12.0\bin"
 
+# Tesseract executable on your machine (used by pytesseract)
+TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+# tessdata folder for tesserocr; when unset, tesserocr's built-in search path is used
+TESSDATA_PATH = os.getenv('TESSDATA_PATH')
+
 
 class OCREngine:
     def __init__(self, languages='eng'):
@@ -22,20 +38,54 @@ class OCREngine:
         """
         self.languages = languages
 
+        # One tesserocr API per thread; an API instance is not thread-safe
+        self._local = threading.local()
+        self._use_tesserocr = TESSEROCR_AVAILABLE
+
+        # Long-lived workers for page-level OCR, so each keeps its Tesseract API warm
+        self._page_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
         # Point pytesseract to the Tesseract executable
-        pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+    def _get_api(self):
+        """
+        Return this thread's resident Tesseract API, creating it on first use
+
+        Returns:
+        PyTessBaseAPI: The API, or None if tesserocr is unavailable or fails
+                       to initialize (callers then fall back to pytesseract)
+        """
+        if not self._use_tesserocr:
+            return None
+
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            options = {'path': TESSDATA_PATH} if TESSDATA_PATH else {}
+            try:
+                api = PyTessBaseAPI(
+                    lang=self.languages,
+                    psm=PSM.SINGLE_BLOCK,
+                    oem=OEM.DEFAULT,
+                    **options,
+                )
+            except RuntimeError as e:
+                # Missing or unreadable language data; don't retry on every page
+                print(f"tesserocr unavailable, falling back to pytesseract: {e}")
+                self._use_tesserocr = False
+                return None
+            self._local.api = api
+        return api
 
     def preprocess_image(self, image):
         """Preprocess image for better OCR results"""
-        # Convert to grayscale if it's a color image
+        # Pages are decoded as grayscale; convert anything passed in colour
         if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
         # Apply adaptive thresholding (fixed constant)
         thresh = cv2.adaptiveThreshold(
-            gray,
+            image,
             255,
             cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
             cv2.THRESH_BINARY,
@@ -43,31 +93,34 @@ class OCREngine:
             2,
         )
 
-        # Noise removal
-        kernel = np.ones((1, 1), np.uint8)
-        opening = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
-
-        # Dilation to make text more prominent
-        kernel = np.ones((1, 1), np.uint8)
-        dilated = cv2.dilate(opening, kernel, iterations=1)
-
-        return dilated
+        return thresh
 
     def load_file(self, filepath):
         """Load image or PDF file and return list of images"""
         if filepath.lower().endswith(('.png', '.jpg', '.jpeg', '.tif', '.tiff')):
-            return [cv2.imread(filepath)]
+            # OCR only needs luminance, so decode straight to grayscale
+            return [cv2.imread(filepath, cv2.IMREAD_GRAYSCALE)]
         elif filepath.lower().endswith('.pdf'):
-            # Convert PDF to images using explicit poppler_path
-            return [
-                np.array(img)
-                for img in convert_from_path(filepath, poppler_path=POPPLER_PATH)
-            ]
+            # Convert PDF to grayscale images using explicit poppler_path;
+            # 150 dpi is plenty for OCR and Poppler rasterizes pages in parallel
+            pages = convert_from_path(
+                filepath,
+                poppler_path=POPPLER_PATH,
+                dpi=150,
+                grayscale=True,
+                thread_count=os.cpu_count() or 1,
+            )
+            return [np.array(img) for img in pages]
         else:
             raise ValueError("Unsupported file format")
 
     def extract_text(self, image):
         """Extract text from image using OCR"""
+        api = self._get_api()
+        if api is not None:
+            api.SetImage(Image.fromarray(image))
+            return api.GetUTF8Text().strip()
+
         # Configure tesseract for handwritten text
         custom_config = f'--oem 3 --psm 6 -l {self.languages}'
 
@@ -76,6 +129,81 @@ class OCREngine:
 
         return text.strip()
 
+    def extract_words(self, image):
+        """
+        Run OCR once over a whole image and return the recognised words
+
+        Parameters:
+        image (numpy.ndarray): Input image
+
+        Returns:
+        list: (top, line_key, text) tuples in reading order, where line_key
+              identifies the text line the word belongs to
+        """
+        api = self._get_api()
+        if api is not None:
+            return self._extract_words_tesserocr(api, image)
+
+        custom_config = f'--oem 3 --psm 6 -l {self.languages}'
+
+        data = pytesseract.image_to_data(image, config=custom_config, output_type=Output.DICT)
+
+        words = []
+        for i, text in enumerate(data['text']):
+            text = text.strip()
+            if text:
+                line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+                words.append((data['top'][i], line_key, text))
+
+        return words
+
+    def _extract_words_tesserocr(self, api, image):
+        """Same as extract_words, using the resident tesserocr API"""
+        api.SetImage(Image.fromarray(image))
+        api.Recognize()
+
+        words = []
+        line_num = 0
+        for word in iterate_level(api.GetIterator(), RIL.WORD):
+            text = word.GetUTF8Text(RIL.WORD)
+            if word.IsAtBeginningOf(RIL.TEXTLINE):
+                line_num += 1
+            text = text.strip() if text else ''
+            if text:
+                _, top, _, _ = word.BoundingBox(RIL.WORD)
+                words.append((top, line_num, text))
+
+        return words
+
+    def extract_region_texts(self, image, num_regions=5):
+        """
+        Extract the text of every answer region with a single OCR pass over
+        the page, assigning each word to a region by its vertical position
+
+        Parameters:
+        image (numpy.ndarray): Preprocessed page image
+        num_regions (int): Number of regions (same bands as detect_answer_regions)
+
+        Returns:
+        dict: Dictionary mapping question IDs to extracted text
+        """
+        region_height = image.shape[0] // num_regions
+
+        # Per region: words grouped by text line, in reading order
+        region_lines = [{} for _ in range(num_regions)]
+
+        if region_height > 0:
+            for top, line_key, text in self.extract_words(image):
+                index = top // region_height
+                # Rows past the last full band are not part of any region
+                if index < num_regions:
+                    region_lines[index].setdefault(line_key, []).append(text)
+
+        return {
+            f'q{i+1}': '\n'.join(' '.join(words) for words in lines.values())
+            for i, lines in enumerate(region_lines)
+        }
+
     def detect_answer_regions(self, image, num_regions=5):
         """
         Detect answer regions in the image
@@ -117,24 +245,39 @@ class OCREngine:
         # Load images from file
         images = self.load_file(filepath)
 
-        results = {}
+        return self.process_answer_sheet_arr(images, num_regions)
 
-        for page_num, image in enumerate(images):
-            # Preprocess the image
-            preprocessed = self.preprocess_image(image)
+    def process_answer_sheet_arr(self, images, num_regions=5):
+        """
+        Extract text from all regions of already decoded answer sheet pages
 
-            # Detect answer regions
-            regions = self.detect_answer_regions(preprocessed, num_regions)
+        Parameters:
+        images (list): Page images as returned by load_file
+        num_regions (int): Number of regions to detect
 
-            # Extract text from each region
-            for region in regions:
-                region_id = region['id']
-                region_image = region['image']
+        Returns:
+        dict: Dictionary mapping question IDs to extracted text
+        """
+        results = {}
 
-                # Extract text
-                text = self.extract_text(region_image)
+        if len(images) > 1:
+            # Tesseract releases the GIL, so pages are OCR'd concurrently;
+            # map() keeps page order so later pages still win on conflicts
+            page_results = self._page_executor.map(
+                lambda image: self._process_page(image, num_regions), images
+            )
+        else:
+            page_results = (self._process_page(image, num_regions) for image in images)
 
-                # Store result
-                results[region_id] = text
+        for page_result in page_results:
+            results.update(page_result)
 
         return results
+
+    def _process_page(self, image, num_regions):
+        """Preprocess one page and extract the text of its answer regions"""
+        # Preprocess the image
+        preprocessed = self.preprocess_image(image)
+
+        # Extract text from every region with one OCR call per page
+        return self.extract_region_texts(preprocessed, num_regions)
@@ -1,8 +1,23 @@
 from fpdf import FPDF
+from fpdf.enums import XPos, YPos
 import os
 from datetime import datetime
 
 class ReportGenerator:
+    # Special Unicode characters and their ASCII equivalents
+    _TRANS = str.maketrans({
+        '\u2713': '[OK]',       # ✓
+        '\u2717': '[X]',        # ✗
+        '\u2022': '*',          # •
+        '\u2018': "'",          # '
+        '\u2019': "'",          # '
+        '\u201c': '"',          # "
+        '\u201d': '"',          # "
+        '\u2014': '-',          # —
+        '\u2013': '-',          # –
+        '\u2026': '...',        # …
+    })
+    
     def __init__(self, upload_folder):
         """Initialize Report Generator"""
         self.upload_folder = upload_folder
@@ -14,33 +29,17 @@ class ReportGenerator:
         if not text:
             return ""
         
-        # Convert to string if not already
-        text = str(text)
-        
-        # Replace special Unicode characters with ASCII equivalents
-        replacements = {
-            '\u2713': '[OK]',       # ✓
-            '\u2717': '[X]',        # ✗
-            '\u2022': '*',          # •
-            '\u2018': "'",          # '
-            '\u2019': "'",          # '
-            '\u201c': '"',          # "
-            '\u201d': '"',          # "
-            '\u2014': '-',          # —
-            '\u2013': '-',          # –
-            '\u2026': '...',        # …
-        }
-        
-        for unicode_char, ascii_char in replacements.items():
-            text = text.replace(unicode_char, ascii_char)
-        
-        # Remove any remaining non-latin characters
-        text = text.encode('latin-1', errors='ignore').decode('latin-1')
-        
-        return text
+        # Replace special characters in one pass, then remove any remaining non-latin characters
+        return str(text).translate(self._TRANS).encode('latin-1', errors='ignore').decode('latin-1')
+    
+    def build_report_filename(self, student_id, timestamp=None):
+        """Build the report filename for a student at the given time"""
+        timestamp = timestamp or datetime.now()
+        return f"report_{self._sanitize_text(student_id)}_{timestamp.strftime('%Y%m%d%H%M%S')}.pdf"
     
     def generate_pdf_report(self, student_name, student_id, exam_title, teacher_name,
-                           results_df, evaluation_results, total_score, max_score):
+                           results_df, evaluation_results, total_score, max_score,
+                           report_filename=None):
         """
         Generate a PDF report with evaluation results
         
@@ -53,26 +52,29 @@ class ReportGenerator:
         evaluation_results (dict): Dictionary with detailed evaluation results
         total_score (float): Total score obtained
         max_score (float): Maximum possible score
+        report_filename (str): Filename to save the report as (optional)
         
         Returns:
         str: Filename of generated PDF report
         """
         try:
             pdf = FPDF()
+            # Deflate page streams to keep report files small
+            pdf.set_compression(True)
             pdf.add_page()
             
             # ==================== HEADER ====================
-            pdf.set_font('Arial', 'B', 18)
-            pdf.cell(0, 15, "Answer Sheet Evaluation Report", 0, 1, 'C')
+            pdf.set_font('Helvetica', 'B', 18)
+            pdf.cell(0, 15, "Answer Sheet Evaluation Report", 0, align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
-            pdf.set_font('Arial', '', 1)
-            pdf.cell(0, 2, "", 0, 1)  # Divider line
+            pdf.set_font('Helvetica', '', 1)
+            pdf.cell(0, 2, "", 0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)  # Divider line
             
             # ==================== STUDENT & EXAM INFO ====================
-            pdf.set_font('Arial', 'B', 12)
-            pdf.cell(0, 8, "Evaluation Details", 0, 1)
+            pdf.set_font('Helvetica', 'B', 12)
+            pdf.cell(0, 8, "Evaluation Details", 0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
-            pdf.set_font('Arial', '', 11)
+            pdf.set_font('Helvetica', '', 11)
             
             # Sanitize all text inputs
             student_name = self._sanitize_text(student_name)
@@ -84,42 +86,42 @@ class ReportGenerator:
             col_width = pdf.w / 2.5
             
             pdf.cell(col_width, 8, "Student Name:")
-            pdf.set_font('Arial', '', 11)
-            pdf.cell(0, 8, student_name, 0, 1)
+            pdf.set_font('Helvetica', '', 11)
+            pdf.cell(0, 8, student_name, 0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
-            pdf.set_font('Arial', 'B', 11)
+            pdf.set_font('Helvetica', 'B', 11)
             pdf.cell(col_width, 8, "Student ID:")
-            pdf.set_font('Arial', '', 11)
-            pdf.cell(0, 8, student_id, 0, 1)
+            pdf.set_font('Helvetica', '', 11)
+            pdf.cell(0, 8, student_id, 0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
-            pdf.set_font('Arial', 'B', 11)
+            pdf.set_font('Helvetica', 'B', 11)
             pdf.cell(col_width, 8, "Exam Title:")
-            pdf.set_font('Arial', '', 11)
-            pdf.cell(0, 8, exam_title, 0, 1)
+            pdf.set_font('Helvetica', '', 11)
+            pdf.cell(0, 8, exam_title, 0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
-            pdf.set_font('Arial', 'B', 11)
+            pdf.set_font('Helvetica', 'B', 11)
             pdf.cell(col_width, 8, "Teacher Name:")
-            pdf.set_font('Arial', '', 11)
-            pdf.cell(0, 8, teacher_name, 0, 1)
+            pdf.set_font('Helvetica', '', 11)
+            pdf.cell(0, 8, teacher_name, 0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
-            pdf.set_font('Arial', 'B', 11)
+            pdf.set_font('Helvetica', 'B', 11)
             pdf.cell(col_width, 8, "Evaluation Date:")
-            pdf.set_font('Arial', '', 11)
-            pdf.cell(0, 8, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 0, 1)
+            pdf.set_font('Helvetica', '', 11)
+            pdf.cell(0, 8, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
             # ==================== OVERALL SCORE ====================
             pdf.ln(8)
-            pdf.set_font('Arial', 'B', 13)
-            pdf.cell(0, 10, "Overall Performance", 0, 1)
+            pdf.set_font('Helvetica', 'B', 13)
+            pdf.cell(0, 10, "Overall Performance", 0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
-            pdf.set_font('Arial', '', 11)
+            pdf.set_font('Helvetica', '', 11)
             percentage = (total_score / max_score * 100) if max_score > 0 else 0
             
             # Score box
             pdf.set_fill_color(200, 220, 255)
-            pdf.cell(0, 10, f"Total Score: {total_score} / {max_score}", 0, 1, fill=True)
+            pdf.cell(0, 10, f"Total Score: {total_score} / {max_score}", 0, fill=True, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             pdf.set_fill_color(200, 255, 200)
-            pdf.cell(0, 10, f"Percentage: {percentage:.2f}%", 0, 1, fill=True)
+            pdf.cell(0, 10, f"Percentage: {percentage:.2f}%", 0, fill=True, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
             # Grade assignment
             if percentage >= 80:
@@ -136,15 +138,15 @@ class ReportGenerator:
                 remarks = "Needs Improvement"
             
             pdf.set_fill_color(255, 220, 200)
-            pdf.cell(0, 10, f"Grade: {grade} ({remarks})", 0, 1, fill=True)
+            pdf.cell(0, 10, f"Grade: {grade} ({remarks})", 0, fill=True, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
             # ==================== QUESTION-WISE RESULTS ====================
             pdf.ln(5)
-            pdf.set_font('Arial', 'B', 12)
-            pdf.cell(0, 10, "Question-wise Results", 0, 1)
+            pdf.set_font('Helvetica', 'B', 12)
+            pdf.cell(0, 10, "Question-wise Results", 0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
             # Table headers
-            pdf.set_font('Arial', 'B', 10)
+            pdf.set_font('Helvetica', 'B', 10)
             pdf.set_fill_color(100, 150, 200)
             pdf.set_text_color(255, 255, 255)
             
@@ -154,64 +156,66 @@ class ReportGenerator:
             col4 = 40
             col5 = 70
             
-            pdf.cell(col1, 8, "Q.No.", 1, 0, 'C', True)
-            pdf.cell(col2, 8, "Score", 1, 0, 'C', True)
-            pdf.cell(col3, 8, "Max", 1, 0, 'C', True)
-            pdf.cell(col4, 8, "Percentage", 1, 0, 'C', True)
-            pdf.cell(col5, 8, "Keywords", 1, 1, 'C', True)
+            pdf.cell(col1, 8, "Q.No.", 1, align='C', fill=True, new_x=XPos.RIGHT, new_y=YPos.TOP)
+            pdf.cell(col2, 8, "Score", 1, align='C', fill=True, new_x=XPos.RIGHT, new_y=YPos.TOP)
+            pdf.cell(col3, 8, "Max", 1, align='C', fill=True, new_x=XPos.RIGHT, new_y=YPos.TOP)
+            pdf.cell(col4, 8, "Percentage", 1, align='C', fill=True, new_x=XPos.RIGHT, new_y=YPos.TOP)
+            pdf.cell(col5, 8, "Keywords", 1, align='C', fill=True, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
             # Table rows
-            pdf.set_font('Arial', '', 9)
+            pdf.set_font('Helvetica', '', 9)
             pdf.set_text_color(0, 0, 0)
             
+            # Pull whole columns out once instead of building a Series per row
+            rows = zip(
+                [self._sanitize_text(str(q)) for q in results_df['Question'].tolist()],
+                results_df['Score'].astype(float).tolist(),
+                results_df['Max Score'].astype(float).tolist(),
+                results_df['Percentage'].astype(float).tolist(),
+                [self._sanitize_text(str(k)) for k in results_df['Keywords Matched'].tolist()],
+            )
+            
             alternate_fill = False
-            for _, row in results_df.iterrows():
-                question_id = self._sanitize_text(str(row['Question']))
-                
+            for question_id, score, max_score_q, percentage_q, keywords_matched in rows:
                 # Alternate row colors
                 if alternate_fill:
                     pdf.set_fill_color(240, 240, 240)
                 else:
                     pdf.set_fill_color(255, 255, 255)
                 
-                score = float(row['Score'])
-                max_score_q = float(row['Max Score'])
-                percentage_q = float(row['Percentage'])
-                keywords_matched = self._sanitize_text(str(row['Keywords Matched']))
-                
-                pdf.cell(col1, 8, question_id, 1, 0, 'C', True)
-                pdf.cell(col2, 8, f"{score:.2f}", 1, 0, 'C', True)
-                pdf.cell(col3, 8, f"{max_score_q:.2f}", 1, 0, 'C', True)
-                pdf.cell(col4, 8, f"{percentage_q:.1f}%", 1, 0, 'C', True)
-                pdf.cell(col5, 8, keywords_matched, 1, 1, 'C', True)
+                pdf.cell(col1, 8, question_id, 1, align='C', fill=True, new_x=XPos.RIGHT, new_y=YPos.TOP)
+                pdf.cell(col2, 8, f"{score:.2f}", 1, align='C', fill=True, new_x=XPos.RIGHT, new_y=YPos.TOP)
+                pdf.cell(col3, 8, f"{max_score_q:.2f}", 1, align='C', fill=True, new_x=XPos.RIGHT, new_y=YPos.TOP)
+                pdf.cell(col4, 8, f"{percentage_q:.1f}%", 1, align='C', fill=True, new_x=XPos.RIGHT, new_y=YPos.TOP)
+                pdf.cell(col5, 8, keywords_matched, 1, align='C', fill=True, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
                 
                 alternate_fill = not alternate_fill
             
             # ==================== DETAILED FEEDBACK PAGE ====================
             pdf.add_page()
-            pdf.set_font('Arial', 'B', 13)
-            pdf.cell(0, 10, "Detailed Feedback", 0, 1)
+            pdf.set_font('Helvetica', 'B', 13)
+            pdf.cell(0, 10, "Detailed Feedback", 0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             pdf.ln(3)
             
-            pdf.set_font('Arial', '', 10)
+            pdf.set_font('Helvetica', '', 10)
             
             for question_id, result in evaluation_results.items():
                 question_id = self._sanitize_text(str(question_id))
                 
                 # Question header
-                pdf.set_font('Arial', 'B', 11)
+                pdf.set_font('Helvetica', 'B', 11)
                 pdf.set_fill_color(220, 220, 220)
                 score = float(result['score'])
                 max_q = float(result['max_score'])
                 pdf.cell(0, 8, f"{question_id}: {score:.2f}/{max_q:.2f} marks", 
-                        0, 1, fill=True)
+                        0, fill=True, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
                 
-                pdf.set_font('Arial', '', 9)
+                pdf.set_font('Helvetica', '', 9)
                 
                 # Student answer
-                pdf.set_font('Arial', 'B', 9)
+                pdf.set_font('Helvetica', 'B', 9)
                 pdf.cell(30, 6, "Student Answer:")
-                pdf.set_font('Arial', '', 9)
+                pdf.set_font('Helvetica', '', 9)
                 pdf.ln(6)
                 
                 extracted = self._sanitize_text(result['extracted_text'][:150])
@@ -222,9 +226,9 @@ class ReportGenerator:
                 pdf.ln(2)
                 
                 # Model answer
-                pdf.set_font('Arial', 'B', 9)
+                pdf.set_font('Helvetica', 'B', 9)
                 pdf.cell(30, 6, "Expected Answer:")
-                pdf.set_font('Arial', '', 9)
+                pdf.set_font('Helvetica', '', 9)
                 pdf.ln(6)
                 
                 model = self._sanitize_text(result['model_answer'][:150])
@@ -235,7 +239,7 @@ class ReportGenerator:
                 pdf.ln(2)
                 
                 # Keywords
-                pdf.set_font('Arial', 'B', 9)
+                pdf.set_font('Helvetica', 'B', 9)
                 keywords_list = [self._sanitize_text(k) for k in result['all_keywords'][:5]]
                 keywords_str = ", ".join(keywords_list)
                 if len(result['all_keywords']) > 5:
@@ -244,9 +248,9 @@ class ReportGenerator:
                 pdf.ln(2)
                 
                 # Feedback
-                pdf.set_font('Arial', 'B', 9)
+                pdf.set_font('Helvetica', 'B', 9)
                 pdf.cell(20, 6, "Feedback:")
-                pdf.set_font('Arial', '', 9)
+                pdf.set_font('Helvetica', '', 9)
                 pdf.ln(6)
                 feedback = self._sanitize_text(result['feedback'])
                 pdf.multi_cell(0, 4, feedback)
@@ -255,14 +259,15 @@ class ReportGenerator:
             
             # ==================== FOOTER ====================
             pdf.set_y(-15)
-            pdf.set_font('Arial', 'I', 8)
+            pdf.set_font('Helvetica', 'I', 8)
             pdf.set_text_color(100, 100, 100)
             pdf.cell(0, 10, 
                     f"Digital Marking System - Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 
-                    0, 0, 'C')
+                    0, align='C', new_x=XPos.RIGHT, new_y=YPos.TOP)
             
             # ==================== SAVE PDF ====================
-            report_filename = f"report_{student_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
+            if not report_filename:
+                report_filename = self.build_report_filename(student_id)
             report_path = os.path.join(self.reports_dir, report_filename)
             pdf.output(report_path)
             
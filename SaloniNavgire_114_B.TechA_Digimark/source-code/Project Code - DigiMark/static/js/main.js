@@ -16,6 +16,18 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // PDF reports are rendered in the background; wait for them before downloading
+    const reportLinks = document.querySelectorAll('[data-report-download]');
+    reportLinks.forEach(function(link) {
+        link.addEventListener('click', function(event) {
+            event.preventDefault();
+            // Ignore repeat clicks while a wait is already in progress
+            if (!link.classList.contains('disabled')) {
+                waitForReport(link);
+            }
+        });
+    });
+    
     // Auto-close alerts after 5 seconds
     const alerts = document.querySelectorAll('.alert');
     alerts.forEach(function(alert) {
@@ -48,3 +60,43 @@ function validateFileInput(input, allowedExtensions) {
         input.value = '';
     }
 }
+
+// Poll a report download link until the report is ready, then download it
+function waitForReport(link, attempt = 0) {
+    const maxAttempts = 30;      // ~1 minute
+    const retryDelay = 2000;     // 2 seconds
+    
+    if (!link.dataset.label) {
+        link.dataset.label = link.textContent;
+    }
+    link.classList.add('disabled');
+    
+    // HEAD avoids transferring the PDF just to check it exists; the server
+    // answers 202 while the background job is still rendering it
+    fetch(link.href, { method: 'HEAD', credentials: 'same-origin', redirect: 'manual' })
+        .then(function(response) {
+            if (response.status === 202 && attempt < maxAttempts) {
+                link.textContent = '⏳ Generating report...';
+                setTimeout(function() {
+                    waitForReport(link, attempt + 1);
+                }, retryDelay);
+                return;
+            }
+            
+            link.textContent = link.dataset.label;
+            link.classList.remove('disabled');
+            
+            if (response.status === 202) {
+                alert('The report is taking longer than expected. Please try again in a moment.');
+                return;
+            }
+            
+            // Ready (or an error the server reports on the page): follow the link
+            window.location.href = link.href;
+        })
+        .catch(function() {
+            link.textContent = link.dataset.label;
+            link.classList.remove('disabled');
+            window.location.href = link.href;
+        });
+}